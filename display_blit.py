@@ -0,0 +1,32 @@
+# display_blit.py
+# Partial-screen updates for the ST7789: push only a rectangle of the
+# frame buffer instead of the whole 240x240 image.
+
+
+def _panel_window(box, size, rotation):
+    """Map an image-space box (x0, y0, x1, y1), exclusive end, to the
+    inclusive panel window that ST7789.image_to_data() rotates it onto."""
+    x0, y0, x1, y1 = box
+    w, h = size
+    k = (rotation // 90) % 4
+    if k == 0:
+        return x0, y0, x1 - 1, y1 - 1
+    if k == 1:
+        return y0, w - x1, y1 - 1, w - 1 - x0
+    if k == 2:
+        return w - x1, h - y1, w - 1 - x0, h - 1 - y0
+    return h - y1, x0, h - 1 - y0, x1 - 1
+
+
+def blit_region(disp, image, box):
+    """Send the pixels of `image` inside `box` to the display.
+
+    `image` is the full-size frame buffer in the same orientation that is
+    passed to disp.display(); `box` is (x0, y0, x1, y1) with exclusive end.
+    """
+    rotation = getattr(disp, "_rotation", 0)
+    region = image.crop(box)
+    disp.set_window(*_panel_window(box, image.size, rotation))
+    pixelbytes = disp.image_to_data(region, rotation)
+    for i in range(0, len(pixelbytes), 4096):
+        disp.data(pixelbytes[i:i + 4096])
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# fleet.py
+# Controller for several Pirate Audio players, each running web_server.py.
+#
+# Polls every player's /status concurrently over one pooled keep-alive
+# session, serves the aggregate as a dashboard and JSON API, and fans
+# commands out to groups of players. Every poll carries its own timeout
+# and every host has its own poll task and an overall command deadline,
+# so a dead Pi never delays the others by more than that deadline.
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+from aiohttp import web
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+
+DEFAULT_TIMEOUT = 2.0        # seconds per request
+DEFAULT_COMMAND_TIMEOUT = 6.0  # seconds for a whole command on one host;
+                               # /set_url alone can take ~3 s on a
+                               # time-shift player
+DEFAULT_POLL_INTERVAL = 2.0  # seconds between polls of one host
+DEFAULT_PORT = 8090
+
+
+class Host:
+    """One player and the last thing we heard from it."""
+
+    def __init__(self, name, url, groups=()):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.groups = set(groups) | {"all", name}
+        self.status = None
+        self.online = False
+        self.error = None
+        self.last_seen = None
+        self.latency_ms = None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "url": self.url,
+            "groups": sorted(self.groups - {"all", self.name}),
+            "online": self.online,
+            "status": self.status,
+            "error": self.error,
+            "last_seen": self.last_seen,
+            "latency_ms": self.latency_ms,
+        }
+
+
+class Fleet:
+    def __init__(self, hosts, stations=(), timeout=DEFAULT_TIMEOUT,
+                 poll_interval=DEFAULT_POLL_INTERVAL,
+                 command_timeout=DEFAULT_COMMAND_TIMEOUT):
+        self.hosts = {h.name: h for h in hosts}
+        self.stations = {s["label"]: s["url"] for s in stations}
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.command_timeout = command_timeout
+        self.poll_interval = poll_interval
+        self.session = None
+        self._tasks = []
+        self._refreshes = set()
+
+    # ---- Lifecycle ----
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit_per_host=2, keepalive_timeout=max(30, 3 * self.poll_interval)
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout
+        )
+        self._tasks = [asyncio.create_task(self._poll_loop(h))
+                       for h in self.hosts.values()]
+
+    async def stop(self):
+        tasks = self._tasks + list(self._refreshes)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.session.close()
+
+    # ---- Polling ----
+    async def _poll_loop(self, host):
+        while True:
+            await self.poll(host)
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self, host):
+        started = time.monotonic()
+        try:
+            async with self.session.get(host.url + "/status") as res:
+                res.raise_for_status()
+                host.status = await res.json()
+            host.online = True
+            host.error = None
+            host.last_seen = time.time()
+            host.latency_ms = int((time.monotonic() - started) * 1000)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            host.online = False
+            host.error = str(e) or type(e).__name__
+            host.latency_ms = None
+
+    # ---- Commands ----
+    def select(self, target):
+        """Hosts matching a group or host name ("all" matches every host)."""
+        return [h for h in self.hosts.values() if target in h.groups]
+
+    async def _post(self, host, path, data=None, timeout=None):
+        """POST to a player. Returns an error string for HTTP errors;
+        connection failures and timeouts propagate."""
+        # aiohttp reads timeout=None as "no timeout", not the session's.
+        async with self.session.post(host.url + path, data=data,
+                                     timeout=timeout or self.timeout) as res:
+            body = await res.text()
+            if res.status >= 400:
+                return f"{path}: HTTP {res.status} {body.strip()}"
+        return None
+
+    async def _apply(self, host, command):
+        errors = []
+        url = command.get("url")
+        if url is None and command.get("station") is not None:
+            url = self.stations.get(command["station"])
+            if url is None:
+                return {"ok": False, "errors": [f"unknown station {command['station']!r}"]}
+        path = None
+        try:
+            if url is not None:
+                path = "/set_url"
+                # Switching station blocks on the player (stream connect),
+                # so this one may use the whole command deadline.
+                errors.append(await self._post(
+                    host, path, {"url": url},
+                    timeout=aiohttp.ClientTimeout(total=self.command_timeout)))
+            if command.get("volume") is not None:
+                path = "/set_volume"
+                errors.append(await self._post(
+                    host, path, {"volume": str(int(command["volume"]))}))
+            if command.get("mute") is not None:
+                # Players only expose a toggle; refresh first so we flip
+                # the right ones.
+                path = "/status"
+                async with self.session.get(host.url + path) as res:
+                    res.raise_for_status()
+                    muted = bool((await res.json()).get("muted"))
+                if muted != bool(command["mute"]):
+                    path = "/toggle_mute"
+                    errors.append(await self._post(host, path))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            # The host is unreachable; don't spend a timeout per step.
+            errors.append(f"{path}: {str(e) or type(e).__name__}")
+        errors = [e for e in errors if e]
+        self._refresh(host)
+        return {"ok": not errors, "errors": errors}
+
+    def _refresh(self, host):
+        """Re-poll host in the background so the dashboard catches up
+        without holding up the command response."""
+        task = asyncio.create_task(self.poll(host))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def _apply_with_deadline(self, host, command):
+        try:
+            return await asyncio.wait_for(self._apply(host, command),
+                                          self.command_timeout)
+        except asyncio.TimeoutError:
+            self._refresh(host)
+            return {"ok": False,
+                    "errors": [f"timed out after {self.command_timeout:g}s"]}
+
+    async def command(self, target, command):
+        hosts = self.select(target)
+        results = await asyncio.gather(
+            *(self._apply_with_deadline(h, command) for h in hosts))
+        return {h.name: r for h, r in zip(hosts, results)}
+
+    def snapshot(self):
+        groups = set()
+        for h in self.hosts.values():
+            groups |= h.groups - {h.name}
+        return {
+            "hosts": [h.to_dict() for h in self.hosts.values()],
+            "groups": sorted(groups),
+            "stations": list(self.stations),
+        }
+
+
+# ---- Web app ----
+async def index(request):
+    return web.FileResponse(os.path.join(BASE_DIR, "templates", "fleet.html"))
+
+
+async def fleet_status(request):
+    return web.json_response(request.app["fleet"].snapshot())
+
+
+async def fleet_command(request):
+    if request.content_type == "application/json":
+        try:
+            command = await request.json()
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON")
+    else:
+        command = dict(await request.post())
+    command = {k: v for k, v in command.items() if v not in (None, "")}
+    target = command.pop("target", "all")
+    fleet = request.app["fleet"]
+    if not fleet.select(target):
+        return web.Response(status=404, text=f"No hosts in {target!r}")
+    try:
+        if "volume" in command:
+            command["volume"] = int(command["volume"])
+    except (TypeError, ValueError):
+        return web.Response(status=400, text="Invalid volume")
+    if isinstance(command.get("mute"), str):
+        command["mute"] = command["mute"].lower() in ("1", "true", "on", "yes")
+    return web.json_response(await fleet.command(target, command))
+
+
+def make_app(fleet):
+    app = web.Application()
+    app["fleet"] = fleet
+    app.router.add_get("/", index)
+    app.router.add_get("/fleet/status", fleet_status)
+    app.router.add_post("/fleet/command", fleet_command)
+    app.router.add_static("/static", os.path.join(BASE_DIR, "static"))
+
+    async def on_startup(app):
+        await fleet.start()
+
+    async def on_cleanup(app):
+        await fleet.stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def fleet_from_config(config):
+    fleet_config = config.get("fleet", {})
+    hosts = [Host(h["name"], h["url"], h.get("groups", ()))
+             for h in fleet_config.get("hosts", [])]
+    return Fleet(
+        hosts,
+        stations=config.get("stations", []),
+        timeout=fleet_config.get("timeout", DEFAULT_TIMEOUT),
+        poll_interval=fleet_config.get("poll_interval", DEFAULT_POLL_INTERVAL),
+        command_timeout=fleet_config.get("command_timeout", DEFAULT_COMMAND_TIMEOUT),
+    )
+
+
+if __name__ == "__main__":
+    with open(CONFIG_PATH, "r") as f:
+        config = json.load(f)
+    port = config.get("fleet", {}).get("port", DEFAULT_PORT)
+    web.run_app(make_app(fleet_from_config(config)), host="0.0.0.0", port=port)
@@ -0,0 +1,93 @@
+# input_queue.py
+# Button presses -> one dispatcher thread.
+#
+# gpiozero callbacks only post an event name; a single worker runs the
+# actual handlers. Runs of the same event that pile up while a handler is
+# busy (or arrive within COALESCE_WINDOW of each other) are merged, and the
+# handler is called once with the number of presses.
+import queue
+import threading
+import time
+
+COALESCE_WINDOW = 0.12  # seconds to wait for another identical press
+MAX_BATCH = 0.4         # never hold a batch back longer than this
+# Handlers that connect a stream are worth waiting a full human press
+# interval for, so a burst of "next" presses becomes one jump.
+NAVIGATION_WINDOW = 0.35
+NAVIGATION_MAX_BATCH = 1.5
+
+REPEAT_DELAY = 0.5      # hold this long before auto-repeat starts
+REPEAT_START = 0.25     # first repeat interval
+REPEAT_MIN = 0.04       # fastest repeat interval
+REPEAT_ACCEL = 0.8      # interval multiplier per repeat
+MAX_PENDING = 64        # presses beyond this are dropped, not queued
+
+
+class InputQueue:
+    def __init__(self, window=COALESCE_WINDOW, max_batch=MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._handlers = {}
+        self._timing = {}  # event -> (window, max_batch) overrides
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def on(self, event, handler, window=None, max_batch=None):
+        """Register handler(count) for event, optionally with its own
+        coalescing window and batch limit."""
+        self._handlers[event] = handler
+        self._timing[event] = (window or self.window,
+                               max_batch or self.max_batch)
+
+    def post(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            pass
+
+    def repeat_while_held(self, button, event, hold_time=REPEAT_DELAY):
+        """Keep posting event, faster and faster, while button is held."""
+        button.hold_time = hold_time
+        button.when_held = lambda: threading.Thread(
+            target=self._repeat, args=(button, event), daemon=True
+        ).start()
+
+    def _repeat(self, button, event):
+        interval = REPEAT_START
+        while button.is_pressed:
+            self.post(event)
+            time.sleep(interval)
+            interval = max(REPEAT_MIN, interval * REPEAT_ACCEL)
+
+    def _run(self):
+        pending = None
+        while True:
+            event = pending if pending is not None else self._queue.get()
+            pending = None
+            count = 1
+            window, max_batch = self._timing.get(
+                event, (self.window, self.max_batch))
+            deadline = time.monotonic() + max_batch
+            while True:
+                timeout = min(window, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if nxt != event:
+                    pending = nxt
+                    break
+                count += 1
+            self._dispatch(event, count)
+
+    def _dispatch(self, event, count):
+        handler = self._handlers.get(event)
+        if handler is None:
+            print(f"No handler for input event {event!r}")
+            return
+        try:
+            handler(count)
+        except Exception as e:
+            print(f"Error handling {event!r} x{count}: {e}")
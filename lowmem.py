@@ -0,0 +1,105 @@
+# lowmem.py
+# Low-memory run mode settings and memory introspection.
+#
+# The mode trims libvlc, shrinks the relay ring and turns off the
+# visualizer. It does not keep PIL, NumPy or the TrueType font out of
+# player.py: the ST7789 display needs all three for its first frame.
+# The web players (phat-beat-player.py, web_server.py) never import them.
+import gc
+import time
+import tracemalloc
+
+# Audio-only libvlc: no video/subtitle/OSD chains, no Lua scripting
+# (playlist/meta scripts), no network metadata fetchers, no stats.
+VLC_LOW_MEMORY_ARGS = [
+    "--no-video",
+    "--no-xlib",
+    "--no-spu",
+    "--no-osd",
+    "--no-sub-autodetect-file",
+    "--no-stats",
+    "--no-lua",
+    "--no-metadata-network-access",
+    "--quiet",
+]
+
+_started = time.time()
+_baseline = None
+
+
+def vlc_args(args, low_memory):
+    """libvlc instance arguments, trimmed down in low-memory mode."""
+    return list(args) + (VLC_LOW_MEMORY_ARGS if low_memory else [])
+
+
+def start_tracing(frames=1):
+    """Start tracemalloc; call as early as possible so imports are seen."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def mark_baseline():
+    """Remember the current heap so later reports can show growth."""
+    global _baseline
+    if tracemalloc.is_tracing():
+        _baseline = _snapshot()
+
+
+def _snapshot():
+    """A heap snapshot without tracemalloc's and the import system's own
+    allocations. Baseline and report must filter alike, or compare_to()
+    shows the filtered frames as huge negative growth."""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def _proc_status():
+    """VmRSS/VmHWM/VmSize in kB from /proc (Linux only)."""
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM", "VmSize"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+def _stat_dict(stat):
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+
+
+def report(limit=10):
+    proc = _proc_status()
+    result = {
+        "uptime_s": int(time.time() - _started),
+        "rss_kb": proc.get("VmRSS"),
+        "peak_rss_kb": proc.get("VmHWM"),
+        "vm_size_kb": proc.get("VmSize"),
+        "gc_objects": len(gc.get_objects()),
+        "tracemalloc": tracemalloc.is_tracing(),
+    }
+    if not tracemalloc.is_tracing():
+        return result
+
+    snapshot = _snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    result["traced_kb"] = round(current / 1024, 1)
+    result["traced_peak_kb"] = round(peak / 1024, 1)
+    result["top"] = [_stat_dict(s) for s in snapshot.statistics("lineno")[:limit]]
+    if _baseline is not None:
+        growth = snapshot.compare_to(_baseline, "lineno")[:limit]
+        result["growth"] = [
+            dict(_stat_dict(s), size_diff_kb=round(s.size_diff / 1024, 1))
+            for s in growth
+        ]
+    return result
@@ -7,6 +7,10 @@ import phatbeat_gpiozero as phatbeat
 import os
 import tempfile
 import shutil
+from stream_meta import unwatch, watch_now_playing
+from input_queue import InputQueue, NAVIGATION_MAX_BATCH, NAVIGATION_WINDOW
+import url_cache
+import lowmem
 # ===============================
 # Global variables and constants
 # ===============================
@@ -15,6 +19,7 @@ stations = []
 station_index = 0
 current_url = None
 current_label = None
+now_playing = None
 
 instance = None
 player = None
@@ -27,6 +32,17 @@ timer_end = None
 _timer_lock = threading.Lock()
 initialized = False
 
+timeshift = None      # TimeShift when time-shift mode is enabled
+paused_at = None      # buffer offset while time-shift playback is paused
+NETWORK_CACHING_MS = 1500
+
+inputs = InputQueue()
+
+# ---- Stream suspension ----
+suspend_after = 300   # seconds muted before the stream is stopped (0 = never)
+suspended = False     # stream stopped to save bandwidth/CPU
+_muted_since = None
+
 # ---- Default Volume limits ----
 VOLUME_MIN = 0
 VOLUME_MAX = 200
@@ -49,7 +65,7 @@ def init(cfg):
     """Initialize player state and hardware, but do not start playback."""
     global config, stations, instance, player
     global VOLUME_MIN, VOLUME_MAX, VOLUME_STEP, DEFAULT_VOLUME
-    global timer_interval, current_volume, initialized
+    global timer_interval, current_volume, initialized, timeshift, suspend_after
 
     config = cfg
 
@@ -61,26 +77,53 @@ def init(cfg):
     DEFAULT_VOLUME = config["volume"]["default"]
     current_volume = DEFAULT_VOLUME
     timer_interval = config["timer"]["interval"]
+    suspend_after = config.get("suspend", {}).get("after", suspend_after)
 
     # --- Initialize hardware and VLC ---
-    instance = vlc.Instance("--aout=alsa", "--alsa-audio-device=hw:1,0")
+    low_memory = config.get("memory", {}).get("low_memory", False)
+    instance = vlc.Instance(*lowmem.vlc_args(
+        ["--aout=alsa", "--alsa-audio-device=hw:1,0"], low_memory))
     player = instance.media_player_new()
     player.audio_set_volume(DEFAULT_VOLUME)
 
+    # --- Optional time-shift buffer ---
+    ts_config = config.get("timeshift", {})
+    if ts_config.get("enabled", False):
+        from timeshift import TimeShift
+        timeshift = TimeShift(
+            minutes=ts_config.get("minutes", 30),
+            max_kbps=ts_config.get("max_kbps", 192),
+            path=ts_config.get("path"),
+            port=ts_config.get("port", 8765),
+            caching_ms=NETWORK_CACHING_MS,
+        )
+        timeshift.start()
+
     # --- Clear LEDs ---
     phatbeat.clear()
     phatbeat.show()
 
     # --- Start timer thread ---
     threading.Thread(target=_monitor_timer, daemon=True).start()
+    threading.Thread(target=_monitor_suspend, daemon=True).start()
 
     # --- Register button handlers ---
-    phatbeat.on(BTN_FFWD)(handle_next)
-    phatbeat.on(BTN_REWIND)(handle_prev)
-    phatbeat.on(BTN_PLAYPAUSE)(handle_play_pause)
-    phatbeat.on(BTN_VOLUP)(handle_vol_up)
-    phatbeat.on(BTN_VOLDN)(handle_vol_down)
-    phatbeat.on(BTN_ONOFF)(handle_timer)
+    # Buttons only queue events; the dispatcher merges repeats, so five
+    # quick "next" presses become one jump of five stations.
+    inputs.on("next", next_station, window=NAVIGATION_WINDOW,
+              max_batch=NAVIGATION_MAX_BATCH)
+    inputs.on("prev", prev_station, window=NAVIGATION_WINDOW,
+              max_batch=NAVIGATION_MAX_BATCH)
+    inputs.on("play_pause", lambda n: n % 2 and toggle_pause())
+    inputs.on("vol_up", volume_up)
+    inputs.on("vol_down", volume_down)
+    inputs.on("timer", lambda n: n % 2 and toggle_timer())
+    inputs.repeat_while_held(phatbeat.on(BTN_FFWD, handle_next), "next")
+    inputs.repeat_while_held(phatbeat.on(BTN_REWIND, handle_prev), "prev")
+    phatbeat.on(BTN_PLAYPAUSE, handle_play_pause)
+    inputs.repeat_while_held(phatbeat.on(BTN_VOLUP, handle_vol_up), "vol_up")
+    inputs.repeat_while_held(phatbeat.on(BTN_VOLDN, handle_vol_down), "vol_down")
+    phatbeat.on(BTN_ONOFF, handle_timer)
 
     initialized = True
     print("pHAT BEAT player initialized — ready for playback.")
@@ -129,53 +172,201 @@ def led_pulse(color, steps=8, hold=0.02):
 # Playback controls
 # ===============================
 def play_stream(url):
-    global current_url, current_label
+    global current_url, current_label, now_playing, paused_at, suspended
+    global is_muted, _muted_since
     if not initialized:
         raise RuntimeError("Player not initialized.")
 
+    resuming = suspended
     current_url = url
     current_label = next((s["label"] for s in stations if s["url"] == url), "Unknown")
-    media = instance.media_new(url, "network-caching=1500")
+    now_playing = None
+    paused_at = None
+    suspended = False
+    if timeshift is not None:
+        timeshift.record(url)
+        _play_mrl(timeshift.url_at())
+    else:
+        _play_mrl(url)
+    if resuming and is_muted:
+        # Leaving a suspension is always audible; staying muted would
+        # just suspend again on the next _monitor_suspend pass.
+        player.audio_set_mute(False)
+        is_muted = False
+        _muted_since = None
+    print(f"Playing: {current_label}")
+
+
+def _play_mrl(mrl):
+    media = instance.media_new(mrl, f"network-caching={NETWORK_CACHING_MS}")
+    # Keep the event manager alive: it owns the ctypes callback thunk.
+    unwatch(getattr(player, "_meta_events", None))
+    player._meta_events = watch_now_playing(media, _set_now_playing)
     player.set_media(media)
     player.play()
     time.sleep(1)
     player.audio_set_volume(current_volume)
-    print(f"Playing: {current_label}")
 
 
-def next_station():
+def _set_now_playing(title):
+    global now_playing
+    now_playing = title
+    print(f"Now playing: {title}")
+
+
+def next_station(steps=1):
     global station_index
-    station_index = (station_index + 1) % len(stations)
+    station_index = (station_index + steps) % len(stations)
     led_flash((255, 0, 0))
     play_stream(stations[station_index]["url"])
 
 
-def prev_station():
+def prev_station(steps=1):
     global station_index
-    station_index = (station_index - 1) % len(stations)
+    station_index = (station_index - steps) % len(stations)
     led_flash((255, 0, 255))
     play_stream(stations[station_index]["url"])
 
 
 def toggle_mute():
-    global is_muted
-    player.audio_toggle_mute()
-    is_muted = not is_muted
+    global is_muted, _muted_since
+    if suspended:
+        # Stream was stopped while muted or by the timer: bring it back
+        # audible rather than toggling a player that is not running.
+        _resume()
+        if is_muted:
+            player.audio_set_mute(False)
+            is_muted = False
+    else:
+        player.audio_toggle_mute()
+        is_muted = not is_muted
+    if is_muted:
+        _muted_since = time.time()
+        if suspend_after:
+            url_cache.prefetch(current_url)
+    else:
+        _muted_since = None
     led_pulse((255, 200, 0), steps=6, hold=0.03)
     print("Muted" if is_muted else "Unmuted")
 
 
-def volume_up():
+# ===============================
+# Stream suspension
+# ===============================
+def _suspend(reason):
+    """Stop network and decoding; toggle_mute()/play_stream() resume."""
+    global suspended
+    if suspended:
+        return
+    suspended = True
+    player.stop()
+    if timeshift is not None:
+        timeshift.stop_recording()
+    print(f"Stream suspended ({reason})")
+
+
+def _resume():
+    global suspended, paused_at
+    suspended = False
+    paused_at = None
+    # A resolved URL skips the station's redirect chain on reconnect, but
+    # it may be a tokenized hop that has expired: fall back to the station.
+    url = url_cache.cached(current_url)
+    if timeshift is not None:
+        timeshift.record(url, keep_buffer=True, fallback=current_url)
+        _play_mrl(timeshift.url_at())
+    else:
+        _play_mrl(url)
+        if url != current_url and _playback_failed():
+            print("Resolved URL failed, reconnecting via station URL")
+            url_cache.forget(current_url)
+            _play_mrl(current_url)
+    print(f"Stream resumed: {current_label}")
+
+
+def _playback_failed(timeout=5):
+    """Wait for VLC to start playing; True only if it gave up."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = player.get_state()
+        if state == vlc.State.Playing:
+            return False
+        if state in (vlc.State.Error, vlc.State.Ended):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def _monitor_suspend():
+    while True:
+        muted_since = _muted_since
+        if (suspend_after and is_muted and not suspended
+                and muted_since is not None
+                and time.time() - muted_since >= suspend_after):
+            _suspend(f"muted for {suspend_after}s")
+        time.sleep(5)
+
+
+# ===============================
+# Time-shift controls
+# ===============================
+def toggle_pause():
+    """Pause/resume live radio; falls back to mute without a buffer."""
+    global paused_at
+    if timeshift is None or suspended:
+        toggle_mute()
+        return
+    if paused_at is None:
+        paused_at = timeshift.listening_position()
+        player.stop()
+        led_pulse((0, 128, 255), steps=6, hold=0.03)
+        print("Paused")
+    else:
+        pos, paused_at = paused_at, None
+        _play_mrl(timeshift.url_at(timeshift.position_back(0, pos)))
+        print(f"Resumed {timeshift.delay(pos):.0f}s behind live")
+
+
+def skip_back(seconds=30):
+    global paused_at
+    if timeshift is None:
+        return
+    pos = timeshift.position_back(seconds, paused_at)
+    paused_at = None
+    _play_mrl(timeshift.url_at(pos))
+    print(f"Skipped back: {timeshift.delay(pos):.0f}s behind live")
+
+
+def go_live():
+    global paused_at
+    if timeshift is None:
+        return
+    paused_at = None
+    _play_mrl(timeshift.url_at())
+    print("Back to live")
+
+
+def get_timeshift_status():
+    if timeshift is None:
+        return None
+    return {
+        "paused": paused_at is not None,
+        "delay": round(timeshift.delay(paused_at)),
+        "buffered": round(timeshift.delay(timeshift.ring.tail)),
+    }
+
+
+def volume_up(steps=1):
     global current_volume
-    current_volume = min(VOLUME_MAX, current_volume + VOLUME_STEP)
+    current_volume = min(VOLUME_MAX, current_volume + steps * VOLUME_STEP)
     player.audio_set_volume(current_volume)
     led_flash((0, 255, 0))
     print("Volume up:", current_volume)
 
 
-def volume_down():
+def volume_down(steps=1):
     global current_volume
-    current_volume = max(VOLUME_MIN, current_volume - VOLUME_STEP)
+    current_volume = max(VOLUME_MIN, current_volume - steps * VOLUME_STEP)
     player.audio_set_volume(current_volume)
     led_flash((0, 0, 255))
     print("Volume down:", current_volume)
@@ -230,7 +421,7 @@ def _monitor_timer():
                 timer_end = None
         if expired:
             print("Timer expired — stopping playback")
-            player.stop()
+            _suspend("sleep timer")
             led_flash((255, 0, 0))
         time.sleep(1)
 
@@ -268,9 +459,9 @@ def get_timer_status():
 # ===============================
 # Button callbacks
 # ===============================
-def handle_next(pin): next_station()
-def handle_prev(pin): prev_station()
-def handle_play_pause(pin): toggle_mute()
-def handle_vol_up(pin): volume_up()
-def handle_vol_down(pin): volume_down()
-def handle_timer(pin): toggle_timer()
+def handle_next(pin): inputs.post("next")
+def handle_prev(pin): inputs.post("prev")
+def handle_play_pause(pin): inputs.post("play_pause")
+def handle_vol_up(pin): inputs.post("vol_up")
+def handle_vol_down(pin): inputs.post("vol_down")
+def handle_timer(pin): inputs.post("timer")
@@ -5,6 +5,11 @@ from PIL import Image, ImageDraw, ImageFont
 import st7789
 import json
 import threading
+from display_blit import blit_region
+from stream_meta import unwatch, watch_now_playing
+from input_queue import InputQueue
+import url_cache
+import lowmem
 
 # ---- Backlight ----
 BACKLIGHT_PIN = 13
@@ -21,6 +26,7 @@ VOLUME_MAX = config["volume"]["max"]
 VOLUME_STEP = config["volume"]["step"]
 DEFAULT_VOLUME = config["volume"]["default"]
 DISPLAY_TIMEOUT = 30  # seconds
+SUSPEND_AFTER = config.get("suspend", {}).get("after", 300)  # seconds muted, 0 = never
 
 _last_activity = time.time()
 _display_on = True
@@ -36,19 +42,39 @@ def reset_idle_timer():
 url_to_label = {s["url"]: s["label"] for s in stations}
 
 # ---- Buttons ----
-button_timer = Button(24)
+button_timer = Button(24, hold_time=1.5)  # hold: visualizer page
 btn_a = Button(5)   # volume down
 btn_b = Button(6)   # volume up
 btn_c = Button(16)  # mute toggle
 
 # ---- VLC ----
-instance = vlc.Instance("--aout=alsa", "--alsa-audio-device=hw:1,0")
+LOW_MEMORY = config.get("memory", {}).get("low_memory", False)
+instance = vlc.Instance(*lowmem.vlc_args(
+    ["--aout=alsa", "--alsa-audio-device=hw:1,0"], LOW_MEMORY))
 player = instance.media_player_new()
 current_volume = DEFAULT_VOLUME
 
+# ---- Visualizer (optional) ----
+vis_config = config.get("visualizer", {})
+VIS_FPS = vis_config.get("fps", 15)
+VIS_BOX = (0, 50, 240, 240)  # bar region, redrawn on its own
+VIS_STATS_INTERVAL = 30  # seconds between CPU reports
+analyzer = None
+_visualizer_on = False
+if vis_config.get("enabled", False) and not LOW_MEMORY:
+    # Skipped in low-memory mode to save the FFT buffers and analyser
+    # thread. NumPy itself is loaded either way: st7789 imports it.
+    import spectrum
+    analyzer = spectrum.SpectrumAnalyzer(bands=vis_config.get("bands", 24),
+                                         fps=VIS_FPS)
+    analyzer.active = False  # only analyse while the page is shown
+    if not spectrum.tap_player(player, analyzer, device="hw:1,0"):
+        analyzer = None
+
 # ---- Current stream ----
 current_url = stations[0]["url"]
 current_label = stations[0]["label"]
+now_playing = None  # ICY StreamTitle of the current stream
 
 # ---- Display Setup ----
 disp = st7789.ST7789(
@@ -63,6 +89,18 @@ try:
     )
 except Exception:
     font = None
+_display_lock = threading.Lock()
+
+# ---- Marquee (now playing) ----
+MARQUEE_Y = 115
+MARQUEE_HEIGHT = 24
+MARQUEE_FPS = 20
+MARQUEE_STEP = 2    # pixels per frame
+MARQUEE_GAP = 60    # blank pixels between repeats
+_marquee_strip = None   # pre-rendered text, None when it fits on screen
+_marquee_period = 0
+_marquee_offset = 0
+_pending_title = None   # latest title from VLC, picked up by _marquee_loop
 
 # ---- Timer state ----
 timer_enabled = False
@@ -78,6 +116,11 @@ def update_display():
         backlight.on()
         _display_on = True
 
+    with _display_lock:
+        _draw_screen()
+        disp.display(img)
+
+def _draw_screen():
     img.paste((0, 0, 0), (0, 0, 240, 240))
 
     # station label
@@ -85,6 +128,10 @@ def update_display():
     draw.text(((240 - text_width) // 2, 20), current_label,
               fill=(0, 255, 0), font=font)
 
+    if _visualizer_on:
+        _draw_bars()
+        return
+
     # mute
     if is_muted:
         mute_text = "MUTED"
@@ -109,45 +156,239 @@ def update_display():
             w, _ = draw.textsize(stop_text, font=font)
             draw.text(((240 - w) // 2, 90), stop_text, fill=(255, 0, 0), font=font)
 
-    disp.display(img)
+    # now playing
+    _draw_marquee()
+
+# ---- Marquee ----
+def set_now_playing(title):
+    """Runs on VLC's event thread: only hand the title over; the marquee
+    thread renders it and redraws just its row."""
+    global _pending_title
+    _pending_title = title
+    print(f"Now playing: {title}")
+
+def _set_marquee(title):
+    """Render the title once into a wide strip; scrolling only crops it."""
+    global now_playing, _marquee_strip, _marquee_period, _marquee_offset
+    strip = None
+    period = 0
+    if title:
+        text_width, _ = draw.textsize(title, font=font)
+        if text_width > 240:
+            # Two copies one period apart, so any 240px window wraps cleanly.
+            period = text_width + MARQUEE_GAP
+            strip = Image.new("RGB", (period + 240, MARQUEE_HEIGHT), (0, 0, 0))
+            strip_draw = ImageDraw.Draw(strip)
+            strip_draw.text((0, 0), title, fill=(255, 255, 0), font=font)
+            strip_draw.text((period, 0), title, fill=(255, 255, 0), font=font)
+    with _display_lock:
+        now_playing = title
+        _marquee_strip = strip
+        _marquee_period = period
+        _marquee_offset = 0
+
+def _draw_marquee():
+    if _marquee_strip is not None:
+        window = _marquee_strip.crop(
+            (_marquee_offset, 0, _marquee_offset + 240, MARQUEE_HEIGHT))
+        img.paste(window, (0, MARQUEE_Y))
+        return
+    img.paste((0, 0, 0), (0, MARQUEE_Y, 240, MARQUEE_Y + MARQUEE_HEIGHT))
+    if now_playing:
+        w, _ = draw.textsize(now_playing, font=font)
+        draw.text(((240 - w) // 2, MARQUEE_Y), now_playing,
+                  fill=(255, 255, 0), font=font)
+
+def _marquee_loop():
+    """Advance the marquee and push only its row to the panel."""
+    global _marquee_offset
+    frame = 1.0 / MARQUEE_FPS
+    box = (0, MARQUEE_Y, 240, MARQUEE_Y + MARQUEE_HEIGHT)
+    next_frame = time.monotonic()
+    while True:
+        title = _pending_title
+        changed = title != now_playing
+        if changed:
+            # Not user activity: don't wake the backlight or reset the timeout.
+            _set_marquee(title)
+        with _display_lock:
+            if _display_on and not _visualizer_on:
+                if _marquee_strip is not None:
+                    _marquee_offset = (_marquee_offset + MARQUEE_STEP) % _marquee_period
+                if changed or _marquee_strip is not None:
+                    _draw_marquee()
+                    blit_region(disp, img, box)
+        next_frame += frame
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_frame = time.monotonic()
+
+threading.Thread(target=_marquee_loop, daemon=True).start()
+
+# ---- Visualizer ----
+def _draw_bars():
+    x0, y0, x1, y1 = VIS_BOX
+    draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=(0, 0, 0))
+    levels = analyzer.levels()
+    slot = (x1 - x0) // len(levels)
+    for i, level in enumerate(levels):
+        h = int(level * (y1 - y0))
+        if h:
+            left = x0 + i * slot
+            draw.rectangle((left + 1, y1 - h, left + slot - 2, y1 - 1),
+                           fill=(0, 255, 0))
+
+def toggle_visualizer():
+    global _visualizer_on
+    if analyzer is None:
+        return
+    _visualizer_on = not _visualizer_on
+    analyzer.active = _visualizer_on
+    if not _visualizer_on:
+        analyzer.clear()
+    update_display()
+    print(f"Visualizer: {_visualizer_on}")
+
+def _visualizer_loop():
+    """Redraw only the bar region at VIS_FPS and report CPU use."""
+    frame = 1.0 / VIS_FPS
+    render_cpu = 0.0
+    last_report = time.monotonic()
+    next_frame = time.monotonic()
+    while True:
+        if _visualizer_on and _display_on:
+            t0 = time.thread_time()
+            with _display_lock:
+                _draw_bars()
+                blit_region(disp, img, VIS_BOX)
+            render_cpu += time.thread_time() - t0
+        now = time.monotonic()
+        if now - last_report >= VIS_STATS_INTERVAL:
+            stats = analyzer.stats()
+            print(f"Spectrum: analysis {stats['cpu_percent']}% CPU "
+                  f"({stats['frames']} frames, {stats['dropped']} dropped), "
+                  f"render {100 * render_cpu / (now - last_report):.1f}% CPU")
+            render_cpu = 0.0
+            last_report = now
+        next_frame += frame
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_frame = time.monotonic()
+
+if analyzer is not None:
+    threading.Thread(target=_visualizer_loop, daemon=True).start()
 
 # ---- Stream ----
-def play_stream(url):
-    global current_url, current_label
+def play_stream(url, mrl=None):
+    """Play url; mrl, if given, is what VLC actually opens (e.g. the
+    already-resolved address of url)."""
+    global current_url, current_label, suspended, _pending_title
+    global is_muted, _muted_since
+    resuming = suspended
     current_url = url
+    suspended = False
     current_label = url_to_label.get(url, "Unknown Station")
 
     # Clear STOPPED_BY_TIMER flag on new playback
     if hasattr(player, "_stopped_by_timer"):
         player._stopped_by_timer = False
 
-    media = instance.media_new(url, "network-caching=1500")
+    _pending_title = None
+    _set_marquee(None)
+    media = instance.media_new(mrl or url, "network-caching=1500")
+    # Keep the event manager alive: it owns the ctypes callback thunk.
+    unwatch(getattr(player, "_meta_events", None))
+    player._meta_events = watch_now_playing(media, set_now_playing)
     player.set_media(media)
     player.play()
     time.sleep(1)
     player.audio_set_volume(current_volume)
+    if resuming and is_muted:
+        # Leaving a suspension is always audible; staying muted would
+        # just suspend again on the next _monitor_suspend pass.
+        player.audio_set_mute(False)
+        is_muted = False
+        _muted_since = None
     update_display()
 
 # ---- Mute ----
 is_muted = False
+suspended = False  # stream stopped while muted or by the timer
+_muted_since = None
+
 def toggle_mute():
-    global is_muted
-    player.audio_toggle_mute()
-    is_muted = not is_muted
+    global is_muted, _muted_since
+    if suspended:
+        # Resume audible; a resolved URL skips the redirect chain, but may
+        # be a tokenized hop that has expired.
+        mrl = url_cache.cached(current_url)
+        play_stream(current_url, mrl=mrl)
+        if mrl != current_url and _playback_failed():
+            print("Resolved URL failed, reconnecting via station URL")
+            url_cache.forget(current_url)
+            play_stream(current_url)
+        if is_muted:
+            player.audio_set_mute(False)
+            is_muted = False
+    else:
+        player.audio_toggle_mute()
+        is_muted = not is_muted
+    if is_muted:
+        _muted_since = time.time()
+        if SUSPEND_AFTER:
+            url_cache.prefetch(current_url)
+    else:
+        _muted_since = None
     update_display()
     print(f"Muted: {is_muted}")
 
+def _playback_failed(timeout=5):
+    """Wait for VLC to start playing; True only if it gave up."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = player.get_state()
+        if state == vlc.State.Playing:
+            return False
+        if state in (vlc.State.Error, vlc.State.Ended):
+            return True
+        time.sleep(0.2)
+    return False
+
+def _suspend(reason):
+    """Stop network and decoding until toggle_mute() or play_stream()."""
+    global suspended
+    if suspended:
+        return
+    suspended = True
+    player.stop()
+    print(f"Stream suspended ({reason})")
+
+def _monitor_suspend():
+    while True:
+        muted_since = _muted_since
+        if (SUSPEND_AFTER and is_muted and not suspended
+                and muted_since is not None
+                and time.time() - muted_since >= SUSPEND_AFTER):
+            _suspend(f"muted for {SUSPEND_AFTER}s")
+        time.sleep(5)
+
+threading.Thread(target=_monitor_suspend, daemon=True).start()
+
 # ---- Volume ----
-def volume_up():
+def volume_up(steps=1):
     global current_volume
-    current_volume = min(VOLUME_MAX, current_volume + VOLUME_STEP)
+    current_volume = min(VOLUME_MAX, current_volume + steps * VOLUME_STEP)
     player.audio_set_volume(current_volume)
     update_display()
     print(f"Volume up: {current_volume}")
 
-def volume_down():
+def volume_down(steps=1):
     global current_volume
-    current_volume = max(VOLUME_MIN, current_volume - VOLUME_STEP)
+    current_volume = max(VOLUME_MIN, current_volume - steps * VOLUME_STEP)
     player.audio_set_volume(current_volume)
     update_display()
     print(f"Volume down: {current_volume}")
@@ -175,7 +416,7 @@ def _monitor_timer():
             try:
                 print("Timer fired")
                 player._stopped_by_timer = True
-                player.stop()  # called outside lock
+                _suspend("sleep timer")  # called outside lock
                 print("Player stopped by timer")
             except Exception as e:
                 print(f"Error stopping player: {e}")
@@ -211,13 +452,27 @@ def set_timer_interval(minutes):
     if timer_enabled:
         start_timer()
 
-button_timer.when_pressed = toggle_timer
+# Short press toggles the timer; holding switches the visualizer page.
+_timer_button_held = False
+
+def _timer_button_held_cb():
+    global _timer_button_held
+    _timer_button_held = True
+    inputs.post("visualizer")
+
+def _timer_button_released():
+    global _timer_button_held
+    if _timer_button_held:
+        _timer_button_held = False
+    else:
+        inputs.post("timer")
 
 # ---- Idle display monitor ----
 def idle_display_monitor():
     global _display_on
     while True:
-        if _display_on and time.time() - _last_activity > DISPLAY_TIMEOUT:
+        if (_display_on and not _visualizer_on
+                and time.time() - _last_activity > DISPLAY_TIMEOUT):
             backlight.off()
             _display_on = False
         time.sleep(1)
@@ -225,9 +480,26 @@ def idle_display_monitor():
 threading.Thread(target=idle_display_monitor, daemon=True).start()
 
 # ---- Button events ----
-btn_a.when_pressed = volume_down
-btn_b.when_pressed = volume_up
-btn_c.when_pressed = toggle_mute
+# Callbacks only queue events; one dispatcher thread runs the handlers and
+# merges repeated presses (three volume steps become one volume set).
+inputs = InputQueue()
+inputs.on("vol_down", volume_down)
+inputs.on("vol_up", volume_up)
+inputs.on("mute", lambda n: n % 2 and toggle_mute())
+inputs.on("timer", lambda n: n % 2 and toggle_timer())
+inputs.on("visualizer", lambda n: n % 2 and toggle_visualizer())
+
+btn_a.when_pressed = lambda: inputs.post("vol_down")
+btn_b.when_pressed = lambda: inputs.post("vol_up")
+btn_c.when_pressed = lambda: inputs.post("mute")
+inputs.repeat_while_held(btn_a, "vol_down")
+inputs.repeat_while_held(btn_b, "vol_up")
+
+if analyzer is not None:
+    button_timer.when_held = _timer_button_held_cb
+    button_timer.when_released = _timer_button_released
+else:
+    button_timer.when_pressed = lambda: inputs.post("timer")
 
 # ---- Initial playback ----
 play_stream(current_url)
@@ -0,0 +1,176 @@
+# relay.py
+# Share the playing stream with local listeners over one upstream connection.
+#
+# An upstream thread reads the station straight into a fixed bytearray
+# ring; every HTTP listener walks the ring with its own cursor, so upstream
+# bandwidth does not depend on how many listeners there are. WSGI servers
+# only accept bytes, so each chunk is copied once out of the ring when it is
+# handed to a listener. A listener that falls half a ring behind is skipped
+# ahead to live; one that gets within reach of the writer is dropped.
+import http.client
+import threading
+import time
+import urllib.request
+
+RING_SIZE = 1024 * 1024   # ~1 min of 128 kbps audio
+CHUNK_SIZE = 16384
+PREROLL = 64 * 1024       # bytes of history a new listener starts with
+IDLE_TIMEOUT = 10         # seconds without listeners before disconnecting
+CONNECT_TIMEOUT = 10
+RECONNECT_DELAY = 2
+
+
+class StreamRelay:
+    def __init__(self, url_source, size=RING_SIZE, preroll=PREROLL,
+                 idle_timeout=IDLE_TIMEOUT):
+        """url_source() returns the URL the player is on right now."""
+        self._url_source = url_source
+        self.size = size
+        self.preroll = min(preroll, size // 4)
+        self.idle_timeout = idle_timeout
+        self._ring = bytearray(size)
+        self._view = memoryview(self._ring)
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.head = 0           # total bytes received
+        self.generation = 0     # bumped on every (re)connect
+        self._generation_start = 0
+        self.connected = False
+        self.content_type = "audio/mpeg"
+        self.listeners = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    @property
+    def tail(self):
+        return max(0, self.head - self.size)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "url": self._url_source() if self._thread is not None else None,
+                "connected": self.connected,
+                "listeners": self.listeners,
+                "upstream_bytes": self.head,
+                "skipped": self.skipped,
+                "dropped": self.dropped,
+            }
+
+    # ---- Upstream ----
+    def open(self):
+        """Make sure upstream is running; return its generation, or None if
+        it could not connect within CONNECT_TIMEOUT."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._upstream, daemon=True)
+                self._thread.start()
+            thread = self._thread
+            self._cond.wait_for(
+                lambda: self.connected or self._thread is not thread,
+                CONNECT_TIMEOUT,
+            )
+            return self.generation if self.connected else None
+
+    def _idle(self, since):
+        """True (and the thread deregistered) once nobody has listened
+        for idle_timeout seconds. Call with the lock held."""
+        if self.listeners:
+            return False
+        if time.monotonic() - since < self.idle_timeout:
+            return False
+        self._thread = None
+        self.connected = False
+        self.generation += 1
+        self._cond.notify_all()
+        return True
+
+    def _upstream(self):
+        idle_since = time.monotonic()
+        try:
+            while True:
+                url = self._url_source()
+                try:
+                    req = urllib.request.Request(
+                        url, headers={"User-Agent": "pirate-audio-relay"}
+                    )
+                    with urllib.request.urlopen(req, timeout=CONNECT_TIMEOUT) as res:
+                        with self._cond:
+                            self.content_type = res.headers.get("Content-Type", "audio/mpeg")
+                            self.generation += 1
+                            self._generation_start = self.head
+                            self.connected = True
+                            self._cond.notify_all()
+                        print(f"Relay connected: {url}")
+                        while self._url_source() == url:
+                            start = self.head % self.size
+                            n = min(CHUNK_SIZE, self.size - start)
+                            got = res.readinto(self._view[start:start + n])
+                            if not got:
+                                break
+                            with self._cond:
+                                self.head += got
+                                self._cond.notify_all()
+                                if self.listeners:
+                                    idle_since = time.monotonic()
+                                elif self._idle(idle_since):
+                                    print("Relay idle, upstream closed")
+                                    return
+                except (OSError, ValueError, http.client.HTTPException) as e:
+                    print(f"Relay upstream error: {e}")
+                    time.sleep(RECONNECT_DELAY)
+                with self._cond:
+                    self.connected = False
+                    self.generation += 1
+                    self._cond.notify_all()
+                    if self._idle(idle_since):
+                        return
+        finally:
+            # However the loop ends, let open() start a new thread and
+            # wake listeners waiting on this one.
+            with self._cond:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                    self.connected = False
+                    self.generation += 1
+                    self._cond.notify_all()
+
+    # ---- Listeners ----
+    def _lapped(self, pos):
+        """True if bytes at pos may already be overwritten: readinto()
+        fills [head, head + CHUNK_SIZE) before head moves, so that much
+        of the oldest data is never safe to read. Call with the lock held."""
+        return pos < self.head + CHUNK_SIZE - self.size
+
+    def stream(self, generation):
+        """Yield chunks of the ring (as bytes) for one listener.
+
+        Ends when the upstream reconnects or switches station (the client
+        is expected to reconnect), or when the listener is dropped.
+        """
+        with self._cond:
+            self.listeners += 1
+            pos = max(self.tail, self.head - self.preroll, self._generation_start)
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self.head > pos or self.generation != generation,
+                        CONNECT_TIMEOUT,
+                    )
+                    if self.generation != generation or self.head <= pos:
+                        return
+                    if self._lapped(pos):
+                        self.dropped += 1
+                        return
+                    if self.head - pos > self.size // 2:
+                        pos = self.head - self.preroll
+                        self.skipped += 1
+                    start = pos % self.size
+                    n = min(CHUNK_SIZE, self.head - pos, self.size - start)
+                    chunk = bytes(self._view[start:start + n])
+                yield chunk
+                pos += n
+        finally:
+            with self._cond:
+                self.listeners -= 1
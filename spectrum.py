@@ -0,0 +1,166 @@
+# spectrum.py
+# Bar spectrum of the playing stream, computed off the audio thread.
+import ctypes
+import queue
+import threading
+import time
+
+import numpy as np
+import vlc
+
+try:
+    import alsaaudio
+except ImportError:
+    alsaaudio = None
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BYTES_PER_FRAME = 2 * CHANNELS  # S16
+
+
+class SpectrumAnalyzer:
+    """Turns interleaved S16 PCM into smoothed, log-spaced band levels.
+
+    feed() is called from the audio thread and never blocks: chunks go into
+    a bounded queue, and when the worker is behind the oldest queued chunk
+    is dropped (and counted) to make room for the new one.
+    The worker always analyses the newest fft_size samples it has, so a slow
+    board skips ahead instead of lagging behind the music. It runs at most
+    fps FFTs a second, and none at all while active is False.
+    """
+
+    def __init__(self, bands=24, fft_size=1024, fmin=40.0, fmax=16000.0,
+                 decay=0.75, floor_db=-60.0, queue_size=8, fps=None):
+        self.bands = bands
+        self.fft_size = fft_size
+        self.decay = decay
+        self.floor_db = floor_db
+        self._window = np.hanning(fft_size).astype(np.float32)
+        # Reference level: full-scale sine through the window.
+        self._ref = self._window.sum() / 2
+
+        freqs = np.fft.rfftfreq(fft_size, 1.0 / SAMPLE_RATE)
+        edges = np.geomspace(fmin, min(fmax, SAMPLE_RATE / 2), bands + 1)
+        starts = np.searchsorted(freqs, edges[:-1])
+        # Low bands can be narrower than one bin; give each at least one.
+        for i in range(1, bands):
+            starts[i] = max(starts[i], starts[i - 1] + 1)
+        self._starts = starts
+        # Bins at or above fmax belong to no band.
+        self._end = max(int(np.searchsorted(freqs, edges[-1])), starts[-1] + 1)
+        self._counts = np.diff(np.append(starts, self._end))
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._levels = np.zeros(bands, dtype=np.float32)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._interval = 1.0 / fps if fps else 0.0
+        self._last = 0.0
+        self.active = True  # False: drain and discard, no FFT
+
+        self.frames = 0
+        self.dropped = 0
+        self.cpu_time = 0.0
+        self._started = None
+
+    # ---- Audio thread side ----
+    def feed(self, pcm):
+        while True:
+            try:
+                self._queue.put_nowait(pcm)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    # ---- Worker ----
+    def start(self):
+        if self._thread is None:
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        need = self.fft_size * CHANNELS
+        while True:
+            pcm = self._queue.get()
+            if not self.active:
+                self._pending = self._pending[:0]
+                continue
+            t0 = time.thread_time()
+            samples = np.frombuffer(pcm, dtype=np.int16)
+            pending = np.concatenate((self._pending, samples))[-need:]
+            now = time.monotonic()
+            if len(pending) >= need and now - self._last >= self._interval:
+                self._analyse(pending)
+                self._last = now
+                pending = pending[:0]
+            self._pending = pending
+            self.cpu_time += time.thread_time() - t0
+
+    def _analyse(self, samples):
+        mono = samples.reshape(-1, CHANNELS).mean(axis=1, dtype=np.float32) / 32768.0
+        spectrum = np.abs(np.fft.rfft(mono * self._window))
+        band = np.add.reduceat(spectrum[:self._end], self._starts) / self._counts
+        db = 20 * np.log10(band / self._ref + 1e-9)
+        level = np.clip(1.0 - db / self.floor_db, 0.0, 1.0).astype(np.float32)
+        with self._lock:
+            # Instant attack, exponential fall-off.
+            self._levels = np.maximum(level, self._levels * self.decay)
+        self.frames += 1
+
+    def clear(self):
+        with self._lock:
+            self._levels[:] = 0
+
+    # ---- Readers ----
+    def levels(self):
+        with self._lock:
+            return self._levels.copy()
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "cpu_seconds": round(self.cpu_time, 3),
+            "cpu_percent": round(100 * self.cpu_time / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def tap_player(player, analyzer, device="hw:1,0"):
+    """Route the player's decoded audio through Python.
+
+    VLC hands us S16 PCM (after its software volume/mute), we write it to
+    ALSA and pass a copy to the analyzer. Returns False when pyalsaaudio is
+    not installed, leaving VLC's own output in place.
+    """
+    if alsaaudio is None:
+        print("pyalsaaudio not installed; spectrum disabled")
+        return False
+
+    pcm_out = alsaaudio.PCM(
+        alsaaudio.PCM_PLAYBACK, device=device, channels=CHANNELS,
+        rate=SAMPLE_RATE, format=alsaaudio.PCM_FORMAT_S16_LE, periodsize=1024,
+    )
+
+    @vlc.CallbackDecorators.AudioPlayCb
+    def _play(opaque, samples, count, pts):
+        data = ctypes.string_at(samples, count * BYTES_PER_FRAME)
+        pcm_out.write(data)
+        analyzer.feed(data)
+
+    @vlc.CallbackDecorators.AudioFlushCb
+    def _flush(opaque, pts):
+        analyzer.clear()
+
+    # Keep the ctypes callbacks alive for as long as the player is.
+    player._spectrum_callbacks = (_play, _flush, pcm_out)
+    player.audio_set_callbacks(_play, None, None, _flush, None, None)
+    player.audio_set_format("S16N", SAMPLE_RATE, CHANNELS)
+    analyzer.start()
+    return True
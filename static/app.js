@@ -58,6 +58,25 @@ async function toggleMute() {
     await refreshStatus();
 }
 
+async function timeshiftPause() {
+    await fetch('/timeshift/toggle_pause', { method: 'POST' });
+    await refreshStatus();
+}
+
+async function timeshiftSkipBack(seconds) {
+    await fetch('/timeshift/skip_back', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+        body: new URLSearchParams({seconds: seconds})
+    });
+    await refreshStatus();
+}
+
+async function timeshiftLive() {
+    await fetch('/timeshift/live', { method: 'POST' });
+    await refreshStatus();
+}
+
 async function setStream() {
   const url = document.getElementById('stream_url').value;
   await fetch('/set_url', {
@@ -68,6 +87,16 @@ async function setStream() {
   document.getElementById('current_stream').innerText = url;
 }
 
+// The relay ends the response when the station changes; pick it back up.
+function relayReconnect() {
+  const audio = document.getElementById('relay_audio');
+  if (!audio) return;
+  setTimeout(() => {
+    audio.src = '/relay?t=' + Date.now();
+    audio.play().catch(e => console.error('Relay reconnect failed', e));
+  }, 1000);
+}
+
 async function setPreset(url) {
   document.getElementById('stream_url').value = url;
   await setStream();
@@ -93,11 +122,17 @@ async function refreshStatus() {
         const res = await fetch('/status');
         const data = await res.json();
         document.getElementById('current_stream').innerText = data.url;
+        document.getElementById('now_playing').innerText = data.title || '';
         document.getElementById('current_volume').innerText = data.volume;
         document.getElementById('volume_slider').value = data.volume;
         document.getElementById('mute_state').innerText = data.muted ? "ON" : "OFF";
         document.getElementById('timer-status').innerText =
             'Timer: ' + data.timer_status;
+        const ts = document.getElementById('timeshift_state');
+        if (ts && data.timeshift) {
+            ts.innerText = data.timeshift.paused ? `PAUSED (${data.timeshift.delay}s behind)`
+                : data.timeshift.delay > 2 ? `${data.timeshift.delay}s behind live` : 'LIVE';
+        }
     } catch(e) {
         console.error('Status fetch failed', e);
     }
@@ -0,0 +1,70 @@
+let optionsLoaded = false;
+
+function fillSelect(id, values) {
+  const select = document.getElementById(id);
+  for (const value of values) {
+    const option = document.createElement('option');
+    option.value = value;
+    option.textContent = value;
+    select.appendChild(option);
+  }
+}
+
+function cell(row, text) {
+  const td = document.createElement('td');
+  td.innerText = text === null || text === undefined ? '' : text;
+  row.appendChild(td);
+}
+
+async function refreshFleet() {
+  try {
+    const res = await fetch('/fleet/status');
+    const data = await res.json();
+
+    if (!optionsLoaded) {
+      fillSelect('target', data.groups.concat(data.hosts.map(h => h.name)));
+      fillSelect('station', data.stations);
+      optionsLoaded = true;
+    }
+
+    const body = document.querySelector('#hosts tbody');
+    body.innerHTML = '';
+    for (const host of data.hosts) {
+      const row = document.createElement('tr');
+      const s = host.status || {};
+      cell(row, host.name);
+      cell(row, host.groups.join(', '));
+      cell(row, host.online ? `online (${host.latency_ms} ms)` : `offline: ${host.error || ''}`);
+      cell(row, s.url);
+      cell(row, s.title);
+      cell(row, s.volume);
+      cell(row, s.muted === undefined ? '' : (s.muted ? 'ON' : 'OFF'));
+      cell(row, s.timer_status);
+      body.appendChild(row);
+    }
+  } catch(e) {
+    console.error('Fleet status failed', e);
+  }
+}
+
+async function sendCommand() {
+  const command = {target: document.getElementById('target').value};
+  const station = document.getElementById('station').value;
+  const volume = document.getElementById('volume').value;
+  const mute = document.getElementById('mute').value;
+  if (station) command.station = station;
+  if (volume !== '') command.volume = parseInt(volume, 10);
+  if (mute) command.mute = mute === 'true';
+
+  const res = await fetch('/fleet/command', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify(command)
+  });
+  document.getElementById('result').innerText =
+    res.ok ? JSON.stringify(await res.json(), null, 2) : await res.text();
+  await refreshFleet();
+}
+
+setInterval(refreshFleet, 2000);
+window.addEventListener('load', refreshFleet);
@@ -0,0 +1,40 @@
+# stream_meta.py
+# Now-playing (ICY) metadata for VLC network streams.
+import vlc
+
+
+def watch_now_playing(media, callback):
+    """Call callback(title) whenever VLC reports a new now-playing title.
+
+    Icecast/Shoutcast servers send StreamTitle in-band; VLC surfaces it as
+    Meta.NowPlaying and fires MediaMetaChanged. The callback runs on VLC's
+    event thread, so it must stay short and must not call back into the
+    media player.
+
+    Returns the media's EventManager. python-vlc keeps the ctypes callback
+    on that object, so the caller must hold a reference to it for as long
+    as the media plays.
+    """
+    last = [None]
+
+    def _on_meta_changed(event):
+        title = media.get_meta(vlc.Meta.NowPlaying)
+        if title:
+            title = title.strip()
+        if title and title != last[0]:
+            last[0] = title
+            callback(title)
+
+    events = media.event_manager()
+    events.event_attach(vlc.EventType.MediaMetaChanged, _on_meta_changed)
+    return events
+
+
+def unwatch(events):
+    """Detach a watch_now_playing() callback before dropping its manager.
+
+    libvlc keeps the callback registered on the old media; once the
+    EventManager is collected, a late meta event would call freed memory.
+    """
+    if events is not None:
+        events.event_detach(vlc.EventType.MediaMetaChanged)
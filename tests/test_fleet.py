@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+import fleet
+
+
+def stand_in(status_delay=0, set_url_delay=0, volume_delay=0, hang=False):
+    """A fake web_server.py player; hang=True never answers anything."""
+    state = {"url": "", "volume": 10, "muted": False, "timer_status": "OFF"}
+
+    async def maybe_hang():
+        if hang:
+            await asyncio.sleep(3600)
+
+    async def status(request):
+        await maybe_hang()
+        await asyncio.sleep(status_delay)
+        return web.json_response(state)
+
+    async def set_url(request):
+        await maybe_hang()
+        await asyncio.sleep(set_url_delay)
+        state["url"] = (await request.post())["url"]
+        return web.Response(text="OK")
+
+    async def set_volume(request):
+        await maybe_hang()
+        await asyncio.sleep(volume_delay)
+        state["volume"] = int((await request.post())["volume"])
+        return web.Response(text="OK")
+
+    async def toggle_mute(request):
+        await maybe_hang()
+        state["muted"] = not state["muted"]
+        return web.Response(text="OK")
+
+    app = web.Application()
+    app.router.add_get("/status", status)
+    app.router.add_post("/set_url", set_url)
+    app.router.add_post("/set_volume", set_volume)
+    app.router.add_post("/toggle_mute", toggle_mute)
+    return app, state
+
+
+async def serve(app):
+    runner = web.AppRunner(app, shutdown_timeout=0.1)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+STATIONS = [{"label": "X", "url": "http://example.invalid/x"}]
+COMMAND = {"station": "X", "volume": 30, "mute": True}
+
+
+def test_dead_host_does_not_hold_up_the_group():
+    async def scenario():
+        good_app, good_state = stand_in()
+        hung_app, _ = stand_in(hang=True)
+        good, good_url = await serve(good_app)
+        hung, hung_url = await serve(hung_app)
+        f = fleet.Fleet(
+            [fleet.Host("good", good_url, ["g"]), fleet.Host("hung", hung_url, ["g"])],
+            stations=STATIONS, timeout=1.0, command_timeout=1.5,
+        )
+        await f.start()
+        try:
+            started = time.monotonic()
+            result = await f.command("g", COMMAND)
+            elapsed = time.monotonic() - started
+        finally:
+            await f.stop()
+            await good.cleanup()
+            await hung.cleanup()
+        return result, elapsed, good_state
+
+    result, elapsed, good_state = asyncio.run(scenario())
+    assert elapsed < 2.0
+    assert result["good"] == {"ok": True, "errors": []}
+    assert result["hung"]["ok"] is False
+    assert good_state == {"url": "http://example.invalid/x", "volume": 30,
+                          "muted": True, "timer_status": "OFF"}
+
+
+def test_unreachable_host_fails_fast():
+    async def scenario():
+        f = fleet.Fleet([fleet.Host("gone", "http://127.0.0.1:9")],
+                        stations=STATIONS, timeout=1.0, command_timeout=5.0)
+        await f.start()
+        try:
+            started = time.monotonic()
+            result = await f.command("all", COMMAND)
+            return result, time.monotonic() - started
+        finally:
+            await f.stop()
+
+    result, elapsed = asyncio.run(scenario())
+    assert elapsed < 1.0
+    # Stops at the first connection failure instead of trying every step.
+    assert len(result["gone"]["errors"]) == 1
+    assert result["gone"]["errors"][0].startswith("/set_url:")
+
+
+def test_slow_station_switch_within_command_deadline():
+    async def scenario():
+        app, state = stand_in(set_url_delay=1.5)
+        runner, url = await serve(app)
+        f = fleet.Fleet([fleet.Host("ts", url)], stations=STATIONS,
+                        timeout=1.0, command_timeout=4.0)
+        await f.start()
+        try:
+            return await f.command("all", {"station": "X"}), state
+        finally:
+            await f.stop()
+            await runner.cleanup()
+
+    result, state = asyncio.run(scenario())
+    assert result["ts"] == {"ok": True, "errors": []}
+    assert state["url"] == "http://example.invalid/x"
+
+
+def test_plain_commands_use_the_request_timeout():
+    async def scenario():
+        app, _ = stand_in(volume_delay=3600)
+        runner, url = await serve(app)
+        f = fleet.Fleet([fleet.Host("slow", url)], stations=STATIONS,
+                        timeout=0.5, command_timeout=5.0)
+        await f.start()
+        try:
+            started = time.monotonic()
+            result = await f.command("all", {"volume": 30})
+            return result, time.monotonic() - started
+        finally:
+            await f.stop()
+            await runner.cleanup()
+
+    result, elapsed = asyncio.run(scenario())
+    assert elapsed < 2.0
+    assert result["slow"]["ok"] is False
+    assert result["slow"]["errors"][0].startswith("/set_volume:")
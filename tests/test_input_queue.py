@@ -0,0 +1,70 @@
+import threading
+import time
+
+import input_queue
+from input_queue import InputQueue
+
+
+def recorder(queue, *events, delay=0, **timing):
+    """Register a handler for each event that logs (event, count)."""
+    calls = []
+    changed = threading.Condition()
+
+    def handler_for(event):
+        def handler(count):
+            time.sleep(delay)
+            with changed:
+                calls.append((event, count))
+                changed.notify_all()
+        return handler
+
+    for event in events:
+        queue.on(event, handler_for(event), **timing)
+
+    def wait_for(total, timeout=5):
+        with changed:
+            changed.wait_for(
+                lambda: sum(c for _, c in calls) >= total, timeout)
+        return calls
+
+    return wait_for
+
+
+def test_burst_of_station_presses_is_one_jump():
+    queue = InputQueue()
+    wait_for = recorder(queue, "next", delay=0.3,
+                        window=input_queue.NAVIGATION_WINDOW,
+                        max_batch=input_queue.NAVIGATION_MAX_BATCH)
+    for _ in range(5):
+        queue.post("next")
+        time.sleep(0.15)
+    assert wait_for(5) == [("next", 5)]
+
+
+def test_different_events_are_not_merged():
+    queue = InputQueue()
+    wait_for = recorder(queue, "a", "b")
+    for event in ("a", "a", "b", "a"):
+        queue.post(event)
+    assert wait_for(4) == [("a", 2), ("b", 1), ("a", 1)]
+
+
+def test_double_press_is_an_even_count():
+    # Toggle handlers act on n % 2, so a double press cancels out.
+    queue = InputQueue()
+    wait_for = recorder(queue, "mute")
+    queue.post("mute")
+    time.sleep(0.05)
+    queue.post("mute")
+    assert wait_for(2) == [("mute", 2)]
+
+
+def test_max_batch_bounds_a_held_button():
+    queue = InputQueue(window=0.1, max_batch=0.3)
+    wait_for = recorder(queue, "vol_up")
+    for _ in range(20):
+        queue.post("vol_up")
+        time.sleep(0.05)
+    calls = wait_for(20)
+    assert sum(c for _, c in calls) == 20
+    assert len(calls) >= 3
@@ -0,0 +1,141 @@
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from relay import CHUNK_SIZE, StreamRelay
+
+PERIOD = 251  # byte at stream offset k is k % PERIOD
+
+
+class Upstream(BaseHTTPRequestHandler):
+    connections = 0
+
+    def do_GET(self):
+        Upstream.connections += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.end_headers()
+        pattern = bytes(range(PERIOD)) * 64
+        offset = 0
+        try:
+            while True:
+                start = offset % PERIOD
+                self.wfile.write(pattern[start:start + 4000])
+                offset += 4000
+                time.sleep(0.002)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Upstream.connections = 0
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+def assert_continuous(data):
+    for a, b in zip(data, data[1:]):
+        assert (b - a) % PERIOD == 1
+
+
+def test_relay_streams_through_flask(upstream_url):
+    flask = pytest.importorskip("flask")
+    from werkzeug.serving import make_server
+
+    stream_relay = StreamRelay(lambda: upstream_url, size=256 * 1024,
+                               idle_timeout=1)
+    app = flask.Flask(__name__)
+
+    # Same shape as web_server.relay_route.
+    @app.route("/relay")
+    def relay_route():
+        generation = stream_relay.open()
+        if generation is None:
+            return "Upstream unavailable", 503
+        return flask.Response(stream_relay.stream(generation),
+                              mimetype=stream_relay.content_type)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/relay"
+    results = []
+
+    def listen():
+        with urllib.request.urlopen(url, timeout=10) as res:
+            data = b""
+            while len(data) < 100_000:
+                data += res.read(8192)
+            results.append(data)
+
+    try:
+        listeners = [threading.Thread(target=listen) for _ in range(3)]
+        for t in listeners:
+            t.start()
+        for t in listeners:
+            t.join(timeout=20)
+    finally:
+        server.shutdown()
+
+    assert len(results) == 3
+    for data in results:
+        assert_continuous(data)
+    assert Upstream.connections == 1
+
+
+def test_listener_in_writer_guard_band_is_dropped():
+    size = 256 * 1024
+    stream_relay = StreamRelay(lambda: None, size=size)
+    stream_relay.generation = 1
+    stream_relay.head = size
+    listener = stream_relay.stream(1)
+    first = next(listener)
+    pos = size - stream_relay.preroll + len(first)
+
+    # Writer is about to fill [head, head + CHUNK_SIZE), which wraps onto pos.
+    stream_relay.head = pos - CHUNK_SIZE + size + 1
+    with pytest.raises(StopIteration):
+        next(listener)
+    assert stream_relay.dropped == 1
+    assert stream_relay.listeners == 0
+
+
+def test_slow_listener_skips_ahead():
+    size = 256 * 1024
+    stream_relay = StreamRelay(lambda: None, size=size)
+    stream_relay.generation = 1
+    stream_relay.head = size
+    listener = stream_relay.stream(1)
+    next(listener)
+    stream_relay.head += size // 2 + 1
+    next(listener)
+    assert stream_relay.skipped == 1
+    assert stream_relay.dropped == 0
+    listener.close()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_upstream_restarts_after_unexpected_error(upstream_url):
+    calls = []
+
+    def url_source():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return upstream_url
+
+    stream_relay = StreamRelay(url_source, size=256 * 1024, idle_timeout=1)
+    started = time.monotonic()
+    assert stream_relay.open() is None
+    assert time.monotonic() - started < 2
+    assert stream_relay._thread is None
+    assert stream_relay.open() is not None
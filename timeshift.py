@@ -0,0 +1,223 @@
+# timeshift.py
+# Pause and rewind for live radio.
+#
+# A recorder thread copies the upstream stream into a fixed-size ring
+# buffer backed by a memory-mapped file, and a small localhost HTTP server
+# plays it back to VLC from any position still in the buffer. The file is
+# allocated once and written strictly sequentially, so disk use, SD-card
+# wear and RAM (only the pages in flight) are bounded by the configured
+# number of minutes.
+import http.client
+import mmap
+import os
+import tempfile
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHUNK_SIZE = 16384
+RECONNECT_DELAY = 2  # seconds
+
+
+class RingBuffer:
+    """Byte ring on an mmap'd file, addressed by absolute stream offset.
+
+    `head` counts every byte ever written; offsets older than
+    `head - size` have been overwritten. `generation` changes on reset so
+    readers of a previous station can tell their data is gone.
+    """
+
+    def __init__(self, path, size):
+        self.size = size
+        self._file = open(path, "w+b")
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self.head = 0
+        self.generation = 0
+        self._cond = threading.Condition()
+
+    @property
+    def tail(self):
+        return max(0, self.head - self.size)
+
+    def reset(self):
+        with self._cond:
+            self.head = 0
+            self.generation += 1
+            self._cond.notify_all()
+
+    def write(self, data, generation=None):
+        """Append data; False (nothing written) if generation is given
+        and the buffer has been reset since."""
+        view = memoryview(data)
+        if len(view) > self.size:
+            view = view[-self.size:]
+        with self._cond:
+            if generation is not None and generation != self.generation:
+                return False
+            start = self.head % self.size
+            first = min(len(view), self.size - start)
+            self._map[start:start + first] = view[:first]
+            self._map[:len(view) - first] = view[first:]
+            self.head += len(data)
+            self._cond.notify_all()
+        return True
+
+    def read(self, pos, generation, max_bytes=CHUNK_SIZE, timeout=5.0):
+        """Return (pos, data) for the next bytes at or after pos.
+
+        pos is moved up to the tail if it has been overwritten. data is
+        b"" on timeout and None once the buffer has been reset.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.head > pos or self.generation != generation,
+                timeout,
+            )
+            if self.generation != generation:
+                return pos, None
+            pos = max(pos, self.tail)
+            start = pos % self.size
+            n = min(max_bytes, self.head - pos, self.size - start)
+            return pos, bytes(self._map[start:start + n])
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class TimeShift:
+    def __init__(self, minutes=30, max_kbps=192, path=None, port=8765,
+                 caching_ms=1500):
+        if path is None:
+            path = os.path.join(tempfile.gettempdir(), "pirate-audio-timeshift.buf")
+        self.ring = RingBuffer(path, int(minutes * 60 * max_kbps * 1000 / 8))
+        self.byte_rate = max_kbps * 1000 // 8  # refined from icy-br
+        self.port = port
+        self.caching_ms = caching_ms
+        self.content_type = "audio/mpeg"
+        self.served = 0  # last offset handed to VLC on the newest connection
+        self._connection = 0
+        self._connection_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._recorder = None
+        self._server = None
+
+    # ---- Server ----
+    def start(self):
+        timeshift = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                try:
+                    generation = int(query["gen"][0])
+                    pos = int(query["pos"][0])
+                except (KeyError, ValueError):
+                    self.send_error(400)
+                    return
+                # After a seek VLC opens a new connection while the old
+                # handler may still finish a write; only the newest one
+                # reports what is being heard.
+                with timeshift._connection_lock:
+                    timeshift._connection += 1
+                    connection = timeshift._connection
+                self.send_response(200)
+                self.send_header("Content-Type", timeshift.content_type)
+                self.end_headers()
+                ring = timeshift.ring
+                try:
+                    while True:
+                        pos, data = ring.read(pos, generation)
+                        if data is None:
+                            return
+                        self.wfile.write(data)
+                        pos += len(data)
+                        with timeshift._connection_lock:
+                            if connection == timeshift._connection:
+                                timeshift.served = pos
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    # ---- Recorder ----
+    def record(self, url, keep_buffer=False, fallback=None):
+        """Start recording url. Drops the old buffer unless keep_buffer
+        is set (resuming the same station after stop_recording()). If url
+        fails, the recorder switches to fallback."""
+        self._stop.set()
+        if self._recorder is not None:
+            self._recorder.join(timeout=RECONNECT_DELAY)
+        if not keep_buffer:
+            self.ring.reset()
+            self.served = 0
+        self._stop = threading.Event()
+        # A recorder that outlives the join above must not write the old
+        # station into the new buffer: it only writes to its generation.
+        self._recorder = threading.Thread(
+            target=self._record,
+            args=(url, self._stop, self.ring.generation, fallback),
+            daemon=True,
+        )
+        self._recorder.start()
+
+    def stop_recording(self):
+        """Stop downloading; the buffered audio stays playable."""
+        self._stop.set()
+
+    def _record(self, url, stop, generation, fallback=None):
+        while not stop.is_set():
+            try:
+                req = urllib.request.Request(
+                    url, headers={"User-Agent": "pirate-audio-timeshift"}
+                )
+                with urllib.request.urlopen(req, timeout=10) as res:
+                    if stop.is_set():
+                        break
+                    self.content_type = res.headers.get("Content-Type", "audio/mpeg")
+                    bitrate = res.headers.get("icy-br")
+                    if bitrate:
+                        self.byte_rate = int(bitrate.split(",")[0]) * 1000 // 8
+                    while not stop.is_set():
+                        chunk = res.read1(CHUNK_SIZE)
+                        if not chunk or not self.ring.write(chunk, generation):
+                            break
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                print(f"Time-shift recorder: {e}")
+                if fallback is not None:
+                    url, fallback = fallback, None
+                    continue
+            stop.wait(RECONNECT_DELAY)
+
+    # ---- Positions ----
+    def listening_position(self):
+        """Offset the listener is hearing now: what VLC has read minus
+        what is still sitting in its network cache."""
+        cached = self.byte_rate * self.caching_ms // 1000
+        return max(self.ring.tail, self.served - cached)
+
+    def position_back(self, seconds, pos=None):
+        if pos is None:
+            pos = self.listening_position()
+        pos -= int(max(0, seconds) * self.byte_rate)
+        return max(self.ring.tail, min(pos, self.ring.head))
+
+    def delay(self, pos=None):
+        """Seconds behind live for the given (or current) position."""
+        if pos is None:
+            pos = self.listening_position()
+        return max(0, (self.ring.head - pos) / self.byte_rate)
+
+    def url_at(self, pos=None):
+        """Local MRL for VLC starting at pos (None means live)."""
+        if pos is None:
+            pos = self.ring.head
+        return (f"http://127.0.0.1:{self.port}/stream"
+                f"?gen={self.ring.generation}&pos={pos}")
@@ -0,0 +1,55 @@
+# url_cache.py
+# Resolved station URLs, so a suspended stream reconnects without
+# re-walking redirect chains (many stations bounce through one or two
+# load balancers before reaching an Icecast node).
+import threading
+import time
+import urllib.request
+
+RESOLVE_TTL = 15 * 60   # seconds a resolved URL is trusted
+RESOLVE_TIMEOUT = 5
+MAX_ENTRIES = 32
+
+_resolved = {}  # url -> (final_url, resolved_at)
+_lock = threading.Lock()
+
+
+def resolve(url):
+    """Follow redirects for url and cache where it ends up."""
+    try:
+        req = urllib.request.Request(url, headers={"User-Agent": "pirate-audio"})
+        with urllib.request.urlopen(req, timeout=RESOLVE_TIMEOUT) as res:
+            final = res.geturl()
+    except (OSError, ValueError) as e:
+        print(f"Could not resolve {url}: {e}")
+        return url
+    with _lock:
+        if url not in _resolved and len(_resolved) >= MAX_ENTRIES:
+            oldest = min(_resolved, key=lambda k: _resolved[k][1])
+            del _resolved[oldest]
+        _resolved[url] = (final, time.monotonic())
+    return final
+
+
+def prefetch(url):
+    """Resolve url in the background, unless a fresh result is cached."""
+    with _lock:
+        entry = _resolved.get(url)
+    if entry and time.monotonic() - entry[1] < RESOLVE_TTL:
+        return
+    threading.Thread(target=resolve, args=(url,), daemon=True).start()
+
+
+def forget(url):
+    """Drop a resolved URL that turned out not to work."""
+    with _lock:
+        _resolved.pop(url, None)
+
+
+def cached(url):
+    """The resolved URL if we have a fresh one, else url itself."""
+    with _lock:
+        entry = _resolved.get(url)
+    if entry and time.monotonic() - entry[1] < RESOLVE_TTL:
+        return entry[0]
+    return url
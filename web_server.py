@@ -3,8 +3,9 @@ import time
 import logging
 import json
 import importlib
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 import os
+import lowmem
 
 app = Flask(__name__)
 
@@ -13,6 +14,12 @@ CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
 with open(CONFIG_PATH, "r") as f:
     config = json.load(f)
 
+# ---- Memory profile ----
+mem_config = config.get("memory", {})
+LOW_MEMORY = mem_config.get("low_memory", False)
+if mem_config.get("tracemalloc", False):
+    lowmem.start_tracing(mem_config.get("tracemalloc_frames", 1))
+
 PLAYER_MODULE_NAME = config.get("player_module", "player")
 player = importlib.import_module(PLAYER_MODULE_NAME)
 
@@ -23,11 +30,26 @@ PLAYER_MODULE_NAME = config.get("player_module", "player")  # default to 'player
 player = importlib.import_module(PLAYER_MODULE_NAME)
 
 player.init(config)
+lowmem.mark_baseline()
+
+# ---- Local stream relay (one upstream connection for all listeners) ----
+# Created on first use so its ring buffer only exists if someone listens.
+_relay = None
+_relay_lock = threading.Lock()
+
+def get_relay():
+    global _relay
+    with _relay_lock:
+        if _relay is None:
+            from relay import StreamRelay, RING_SIZE
+            size = RING_SIZE // 4 if LOW_MEMORY else RING_SIZE
+            _relay = StreamRelay(lambda: player.current_url, size=size)
+        return _relay
 
 # ---- Suppress werkzeug INFO logs for specific paths ----
 class FilterPath(logging.Filter):
     def filter(self, record):
-        if any(path in record.getMessage() for path in ['/status']):
+        if any(path in record.getMessage() for path in ['/status', '/relay']):
             return False
         return True
 
@@ -50,9 +72,11 @@ def index():
         volume_min=getattr(player, "VOLUME_MIN", 0),
         volume_max=getattr(player, "VOLUME_MAX", 100),
         muted=getattr(player, "is_muted", False),
+        now_playing=getattr(player, "now_playing", None),
         timer_enabled=getattr(player, "timer_enabled", False),
         timer_remaining=remaining,
-        supports_save=supports_save
+        supports_save=supports_save,
+        supports_timeshift=getattr(player, "timeshift", None) is not None
     )
 
 # In Flask route
@@ -97,14 +121,70 @@ def status():
         "url": player.current_url,
         "volume": player.current_volume,
         "muted": player.is_muted,
-        "timer_status": player.get_timer_status()
+        "suspended": getattr(player, "suspended", False),
+        "title": getattr(player, "now_playing", None),
+        "timer_status": player.get_timer_status(),
+        "timeshift": player.get_timeshift_status() if hasattr(player, "get_timeshift_status") else None
     })
 
+@app.route("/relay")
+def relay_route():
+    relay = get_relay()
+    generation = relay.open()
+    if generation is None:
+        return "Upstream unavailable", 503
+    return Response(
+        relay.stream(generation),
+        mimetype=relay.content_type,
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.route("/relay/status")
+def relay_status():
+    if _relay is None:
+        return jsonify({"connected": False, "listeners": 0})
+    return jsonify(_relay.stats())
+
+@app.route("/debug/memory")
+def debug_memory():
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return "Invalid limit", 400
+    report = lowmem.report(limit)
+    report["low_memory"] = LOW_MEMORY
+    return jsonify(report)
+
 @app.route("/toggle_mute", methods=["POST"])
 def toggle_mute_route():
     player.toggle_mute()
     return "OK", 200
 
+@app.route("/timeshift/toggle_pause", methods=["POST"])
+def timeshift_pause_route():
+    if getattr(player, "timeshift", None) is None:
+        return "Time-shift not enabled", 400
+    player.toggle_pause()
+    return jsonify(player.get_timeshift_status())
+
+@app.route("/timeshift/skip_back", methods=["POST"])
+def timeshift_skip_back_route():
+    if getattr(player, "timeshift", None) is None:
+        return "Time-shift not enabled", 400
+    try:
+        seconds = max(0, int(request.form.get("seconds", 30)))
+    except ValueError:
+        return "Invalid seconds", 400
+    player.skip_back(seconds)
+    return jsonify(player.get_timeshift_status())
+
+@app.route("/timeshift/live", methods=["POST"])
+def timeshift_live_route():
+    if getattr(player, "timeshift", None) is None:
+        return "Time-shift not enabled", 400
+    player.go_live()
+    return jsonify(player.get_timeshift_status())
+
 @app.route("/toggle_timer", methods=["POST"])
 def toggle_timer_route():
     player.toggle_timer()